@@ -0,0 +1,519 @@
+"""Extract the condensed consolidated balance sheet from a 10-Q filing.
+
+Downloads the filing, locates the balance sheet page, extracts the table
+with camelot, and writes the categorized line items to CSV.
+
+Usage:
+    python balance_sheet_extractor.py [--url <pdf-url>]
+"""
+
+import argparse
+import functools
+import hashlib
+import json
+import os
+import re
+import shutil
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import camelot
+import numpy as np
+import pandas as pd
+import requests
+from PyPDF2 import PdfReader
+
+try:
+    import fitz  # PyMuPDF; C-backed text extraction, ~10x faster than PyPDF2
+except ImportError:
+    fitz = None
+
+try:
+    import ahocorasick  # optional; single-pass multi-term row scans
+except ImportError:
+    ahocorasick = None
+
+DEFAULT_URL = (
+    "https://s26.q4cdn.com/463892824/files/doc_financials/2025/q1/"
+    "Snowflake-FY25-Q1-10Q.pdf"
+)
+
+# Compiled once at import; these run for every table row processed. The
+# leading/trailing row-number cleanups are a single alternation so each
+# row pays one regex-engine entry instead of three.
+_LINE_NUM_NOISE_RE = re.compile(r"^\d+,\s*|^\d+\s+|,\d+$")
+_ONLY_NUM_RE = re.compile(r"^\d+$")
+_DATE_RE = re.compile(r"(january|april|july|october)\s+\d{1,2},\s+\d{4}")
+
+category_mappings = {
+    "cash and cash equivalents": "Current Assets",
+    "short-term investments": "Current Assets",
+    "accounts receivable": "Current Assets",
+    "prepaid expenses": "Current Assets",
+    "long-term investments": "Non-Current Assets",
+    "property and equipment": "Non-Current Assets",
+    "operating lease right-of-use": "Non-Current Assets",
+    "goodwill": "Non-Current Assets",
+    "intangible assets": "Non-Current Assets",
+    "accounts payable": "Current Liabilities",
+    "accrued expenses": "Current Liabilities",
+    "deferred revenue": "Current Liabilities",
+    "operating lease liabilities": "Current Liabilities",
+    "common stock": "Stockholders Equity",
+    "additional paid-in capital": "Stockholders Equity",
+    "accumulated deficit": "Stockholders Equity",
+}
+
+_UNWANTED_TERMS = [
+    "condensed consolidated",
+    "in thousands",
+    "in millions",
+    "unaudited",
+    "see accompanying notes",
+]
+
+# One automaton (or compiled alternation) per term set, so each row is
+# scanned once for every keyword instead of once per keyword.
+if ahocorasick is not None:
+    _CATEGORY_AUTOMATON = ahocorasick.Automaton()
+    for _key, _category in category_mappings.items():
+        _CATEGORY_AUTOMATON.add_word(_key, _category)
+    _CATEGORY_AUTOMATON.make_automaton()
+    _UNWANTED_AUTOMATON = ahocorasick.Automaton()
+    for _term in _UNWANTED_TERMS:
+        _UNWANTED_AUTOMATON.add_word(_term, _term)
+    _UNWANTED_AUTOMATON.make_automaton()
+else:
+    _CATEGORY_AUTOMATON = _UNWANTED_AUTOMATON = None
+_CATEGORY_RE = re.compile("|".join(map(re.escape, category_mappings)))
+_UNWANTED_TERMS_RE = re.compile("|".join(map(re.escape, _UNWANTED_TERMS)))
+
+
+def download_pdf(url, output_dir):
+    """Download the filing into output_dir, reusing a cached copy.
+
+    Files are cached under a sha1 of the URL; a HEAD request's
+    Content-Length decides whether the cached copy is still current, so
+    repeated runs skip the transfer entirely.
+    """
+    key = hashlib.sha1(url.encode()).hexdigest()
+    output_path = os.path.join(output_dir, f"{key}.pdf")
+    if os.path.exists(output_path):
+        try:
+            head = requests.head(url, allow_redirects=True, timeout=10)
+            remote_size = int(head.headers.get("Content-Length", -1))
+        except (requests.RequestException, ValueError):
+            remote_size = -1
+        if remote_size in (-1, os.path.getsize(output_path)):
+            print(f"Using cached {output_path}")
+            return output_path
+
+    print(f"Downloading {url}...")
+    with requests.get(url, stream=True) as response:
+        response.raise_for_status()
+        # One 1 MiB buffer between C-level read/write instead of a Python
+        # loop iteration per 8 KiB chunk.
+        response.raw.decode_content = True
+        with open(output_path, "wb") as f:
+            shutil.copyfileobj(response.raw, f, length=1 << 20)
+    return output_path
+
+
+def _match_balance_sheet_page(page_num, text):
+    """Match lowercased page text; returns (page_num, fiscal_period) or None."""
+    if "condensed consolidated balance sheets" not in text:
+        return None
+    fiscal_period = None
+    date_match = _DATE_RE.search(text)
+    if date_match:
+        fiscal_period = date_match.group(0).title()
+    return page_num, fiscal_period
+
+
+@functools.lru_cache(maxsize=None)
+def _open_pdf(pdf_path):
+    """Parse the PDF once per path; shared by scanning and page export.
+
+    Both fitz and PyPDF2 pay an O(pages) parse on open, so the handle is
+    memoized rather than re-opening for each stage of the pipeline.
+    """
+    if fitz is not None:
+        return fitz.open(pdf_path)
+    return PdfReader(pdf_path)
+
+
+def _init_scan_worker():
+    """Pool initializer: make each worker open its own document.
+
+    Under the fork start method workers inherit the parent's populated
+    _open_pdf cache, so every process would share one fitz handle (and
+    one file offset) and concurrent reads corrupt each other. Clearing
+    the cache forces a fresh parse per worker.
+    """
+    _open_pdf.cache_clear()
+
+
+def _scan_pages(pdf_path, page_order):
+    """Scan the given page indexes for the balance sheet; each worker
+    process parses its own handle, in-process callers share the memoized
+    one. Returns the first (page_num, fiscal_period) hit, or None."""
+    doc = _open_pdf(pdf_path)
+    for page_num in page_order:
+        page = doc[page_num]
+        if not page.search_for("Balance Sheets", quads=False):
+            continue
+        result = _match_balance_sheet_page(page_num, page.get_text("text").lower())
+        if result is not None:
+            return result
+    return None
+
+
+def _scan_page_range(pdf_path, start, end):
+    """Contiguous-range scan task for worker processes."""
+    end = min(end, _open_pdf(pdf_path).page_count)
+    return _scan_pages(pdf_path, range(start, end))
+
+
+def _scan_order(page_count, start=5):
+    """Page indexes ordered outward from a likely balance-sheet location.
+
+    10-Qs put the condensed balance sheet a few pages in, 10-Ks later;
+    expanding outward from an early anchor touches a handful of pages on
+    typical filings instead of averaging half the document.
+    """
+    start = min(start, page_count // 2)
+    for offset in range(page_count):
+        for sign in (1, -1):
+            idx = start + sign * offset
+            if 0 <= idx < page_count and (offset > 0 or sign > 0):
+                yield idx
+
+
+# Filings smaller than this are scanned in-process; pool startup would
+# cost more than the scan itself.
+_PARALLEL_PAGE_THRESHOLD = 16
+
+
+def find_balance_sheet_page(pdf_path):
+    """Find the page holding the condensed consolidated balance sheet.
+
+    Returns (page_number, fiscal_period); both None when no page matches.
+    Results are persisted in a sidecar JSON next to the PDF so reruns
+    over a cached download skip the page scan entirely.
+    """
+    sidecar = pdf_path.replace(".pdf", "_page.json")
+    if os.path.exists(sidecar) and os.path.getmtime(sidecar) >= os.path.getmtime(
+        pdf_path
+    ):
+        with open(sidecar) as f:
+            cached = json.load(f)
+        return cached["page_num"], cached["fiscal_period"]
+
+    page_num, fiscal_period = _locate_balance_sheet_page(pdf_path)
+    if page_num is not None:
+        with open(sidecar, "w") as f:
+            json.dump({"page_num": page_num, "fiscal_period": fiscal_period}, f)
+    return page_num, fiscal_period
+
+
+def _locate_balance_sheet_page(pdf_path):
+    """Scan the filing for the balance sheet page.
+
+    With fitz, pages are prefiltered by search_for — a cheap C-level scan
+    of the text layer — so full text extraction runs on at most a couple
+    of pages instead of all of them. Large filings are additionally split
+    into contiguous page ranges scanned across worker processes; the
+    earliest hit wins and the remaining ranges are cancelled.
+    """
+    if fitz is not None:
+        page_count = _open_pdf(pdf_path).page_count
+
+        if page_count <= _PARALLEL_PAGE_THRESHOLD:
+            result = _scan_pages(pdf_path, _scan_order(page_count))
+            return result if result is not None else (None, None)
+
+        workers = os.cpu_count() or 1
+        chunk = -(-page_count // workers)
+        best = None
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_scan_worker
+        ) as executor:
+            futures = [
+                executor.submit(_scan_page_range, pdf_path, start, start + chunk)
+                for start in range(0, page_count, chunk)
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                if result is not None and (best is None or result[0] < best[0]):
+                    best = result
+                    for pending in futures:
+                        pending.cancel()
+        return best if best is not None else (None, None)
+
+    reader = _open_pdf(pdf_path)
+    for page_num in _scan_order(len(reader.pages)):
+        text = reader.pages[page_num].extract_text().lower()
+        result = _match_balance_sheet_page(page_num, text)
+        if result is not None:
+            return result
+    return None, None
+
+
+def _drop_blank_rows(df):
+    """Drop rows that are entirely empty strings or NaN.
+
+    One boolean scan instead of the replace('', nan) + dropna pair, which
+    materializes a full intermediate copy of the frame.
+    """
+    blank = df.eq("") | df.isna()
+    return df.loc[~blank.all(axis=1)]
+
+
+def _good_table(df):
+    """A plausible balance sheet: a couple of columns, double-digit rows."""
+    return not df.empty and len(df.columns) >= 2 and len(df) >= 10
+
+
+def _read_area(pdf_path, pages, area, flavor):
+    """One camelot pass over one crop area; returns cleaned candidate frames."""
+    try:
+        tables = camelot.read_pdf(
+            pdf_path, pages=pages, flavor=flavor, table_areas=[area]
+        )
+    except Exception as e:
+        print(f"camelot {flavor} failed on area {area}: {e}")
+        return []
+    frames = []
+    for table in tables:
+        df = _drop_blank_rows(table.df)
+        if not df.empty:
+            frames.append(df)
+    return frames
+
+
+def extract_tables(pdf_path, page_num):
+    """Extract candidate tables straight from the balance sheet page.
+
+    Camelot accepts arbitrary page strings, so the page is read from the
+    original filing directly — no one-page PDF round-trip on disk.
+
+    The three crop areas are nested rectangles, so most of the 3x2
+    area/flavor grid is redundant work. Lattice on the widest area runs
+    first (highest precision when ruling lines exist), then stream on the
+    same area; the inner-area variants only run — concurrently, since
+    camelot releases the GIL around Ghostscript — when both cheap
+    attempts fail the quality check.
+    """
+    pages = str(page_num + 1)
+    areas = ["50,50,750,550", "100,100,700,500", "150,150,650,450"]
+    for flavor in ("lattice", "stream"):
+        good = [
+            df
+            for df in _read_area(pdf_path, pages, areas[0], flavor)
+            if _good_table(df)
+        ]
+        if good:
+            return max(good, key=len)
+
+    remaining = [
+        (area, flavor) for area in areas[1:] for flavor in ("stream", "lattice")
+    ]
+    candidates = []
+    with ThreadPoolExecutor(max_workers=len(remaining)) as executor:
+        futures = [
+            executor.submit(_read_area, pdf_path, pages, area, flavor)
+            for area, flavor in remaining
+        ]
+        for future in as_completed(futures):
+            candidates.extend(future.result())
+            if any(_good_table(df) for df in candidates):
+                for pending in futures:
+                    pending.cancel()
+                break
+    if not candidates:
+        return None
+    return max(candidates, key=len)
+
+
+def identify_category(line_item, line_lower=None):
+    """Map a line item to its balance sheet category, or None.
+
+    Callers that already stripped row-number noise and lowercased the
+    label pass it via line_lower so the work is not repeated here.
+    """
+    if line_lower is None:
+        line_lower = _LINE_NUM_NOISE_RE.sub("", line_item.lower())
+    if _ONLY_NUM_RE.match(line_lower):
+        return None
+    if _CATEGORY_AUTOMATON is not None:
+        if next(_UNWANTED_AUTOMATON.iter(line_lower), None) is not None:
+            return None
+        hit = next(_CATEGORY_AUTOMATON.iter(line_lower), None)
+        return hit[1] if hit is not None else None
+    if _UNWANTED_TERMS_RE.search(line_lower):
+        return None
+    match = _CATEGORY_RE.search(line_lower)
+    return category_mappings[match.group(0)] if match else None
+
+
+def is_total_line(line_item, amount, sum_previous, has_previous, line_lower=None):
+    """Heuristic: a total row names itself or sums the preceding rows.
+
+    The caller maintains sum_previous as a running accumulator, so this
+    is O(1) per row instead of re-summing the category each time.
+    """
+    if line_lower is None:
+        line_lower = line_item.lower()
+    if "total" in line_lower:
+        return True
+    if amount is None or not has_previous:
+        return False
+    # bool() keeps the return a plain Python bool: the accumulator makes
+    # the comparison an np.bool_, which bytearray.append rejects.
+    return bool(
+        sum_previous != 0 and abs(amount - sum_previous) <= abs(sum_previous) * 0.01
+    )
+
+
+def parse_money_series(s):
+    """Batch-parse one column of reported amounts into float64.
+
+    Currency noise, parenthesized negatives and million/billion suffixes
+    are all handled inside pandas' C string kernels, so no cell falls
+    back to per-value Python dispatch.
+    """
+    s = s.astype("string").str.strip().str.lower()
+    s = s.str.replace(r"[$,\s\xa0]", "", regex=True)
+    s = s.str.replace(r"^\((.*)\)$", r"-\1", regex=True)
+    million = s.str.endswith("million", na=False)
+    billion = s.str.endswith("billion", na=False)
+    scale = pd.Series(1.0, index=s.index).where(~million, 1e6).where(~billion, 1e9)
+    s = s.str.replace(r"(million|billion)$", "", regex=True)
+    return pd.to_numeric(s, errors="coerce") * scale
+
+
+def _parse_amount_columns(df):
+    """Vectorized monetary parsing over a raw table's value columns."""
+    values = df.iloc[:, 1:].astype(str)
+    parsed = {col: parse_money_series(values[col]) for col in values.columns}
+    return pd.DataFrame(parsed, index=df.index)
+
+
+def process_balance_sheet_data(df, fiscal_period):
+    """Turn the raw camelot table into categorized line-item records."""
+    df = _drop_blank_rows(df)
+    if df.empty or df.shape[1] < 2:
+        return pd.DataFrame()
+
+    labels = df.iloc[:, 0].astype(str).str.strip()
+    # First parsable amount per row, computed column-wise up front; the
+    # remaining loop only carries the sequential category state.
+    amounts = _parse_amount_columns(df)
+    first_amount = amounts.bfill(axis=1).iloc[:, 0]
+    has_amount = first_amount.notna()
+
+    # Parallel typed columns instead of a dict per row: scalars append to
+    # compact buffers and the final DataFrame build skips dtype inference.
+    fiscal_quarters = []
+    categories = []
+    line_items = []
+    out_amounts = array("d")
+    total_flags = bytearray()
+    current_category = None
+    category_sum = 0.0
+    category_has_items = False
+    for line_item, amount, row_ok in zip(labels, first_amount, has_amount):
+        if not line_item or line_item == "nan":
+            continue
+        # Strip row-number noise and lowercase once per row; the cleaned
+        # forms are shared by the category, numeric and total checks.
+        cleaned_item = _LINE_NUM_NOISE_RE.sub("", line_item)
+        cleaned_lower = cleaned_item.lower()
+        category = identify_category(cleaned_item, cleaned_lower)
+        if category and category != current_category:
+            current_category = category
+            category_sum = 0.0
+            category_has_items = False
+        if not row_ok:
+            continue
+
+        if _ONLY_NUM_RE.match(cleaned_item):
+            continue
+
+        total_flag = is_total_line(
+            cleaned_item, amount, category_sum, category_has_items, cleaned_lower
+        )
+        if not total_flag:
+            category_sum += amount
+            category_has_items = True
+        fiscal_quarters.append(fiscal_period)
+        categories.append(current_category)
+        line_items.append(cleaned_item)
+        out_amounts.append(amount)
+        total_flags.append(total_flag)
+
+    if not line_items:
+        return pd.DataFrame()
+    return pd.DataFrame(
+        {
+            "fiscal_quarter": fiscal_quarters,
+            "category": categories,
+            "line_item": line_items,
+            "amount": np.frombuffer(out_amounts, dtype=np.float64),
+            "is_total": np.frombuffer(total_flags, dtype=np.bool_),
+        }
+    )
+
+
+def validate_data_consistency(df):
+    """Check that total assets reconcile with liabilities plus equity."""
+    if df.empty:
+        return True
+    # One lowercase pass shared by both keyword scans; numpy masks plus
+    # argmax read the first matching amount without materializing
+    # filtered frames.
+    low = df["line_item"].str.lower()
+    is_tot = df["is_total"].to_numpy(dtype=bool)
+    amounts = df["amount"].to_numpy()
+    ta_mask = low.str.startswith("total assets").to_numpy() & is_tot
+    tle_mask = (
+        low.str.contains("total liabilities and stockholders", regex=False).to_numpy()
+        & is_tot
+    )
+    if not ta_mask.any() or not tle_mask.any():
+        return True
+    total_assets = amounts[np.argmax(ta_mask)]
+    total_liab_equity = amounts[np.argmax(tle_mask)]
+    return abs(total_assets - total_liab_equity) <= abs(total_assets) * 0.01
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Extract a balance sheet from a 10-Q PDF"
+    )
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--output", default="balance_sheet.csv")
+    parser.add_argument("--work-dir", default="/tmp/balance_sheet_extractor")
+    args = parser.parse_args()
+
+    os.makedirs(args.work_dir, exist_ok=True)
+    pdf_path = download_pdf(args.url, args.work_dir)
+
+    page_num, fiscal_period = find_balance_sheet_page(pdf_path)
+    if page_num is None:
+        raise SystemExit("No balance sheet page found")
+    print(f"Balance sheet found on page {page_num + 1} ({fiscal_period})")
+
+    table = extract_tables(pdf_path, page_num)
+    if table is None:
+        raise SystemExit("No tables extracted from the balance sheet page")
+
+    data = process_balance_sheet_data(table, fiscal_period)
+    if not validate_data_consistency(data):
+        print("Warning: total assets do not reconcile with liabilities + equity")
+    data.to_csv(args.output, index=False)
+    print(f"Wrote {len(data)} line items to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+"""Parse the Caltrain weekday timetable PDF into a tidy CSV.
+
+Downloads the published schedule PDF, figures out which pages hold the
+northbound and southbound timetables, extracts the schedule grids with
+Camelot, and writes one row per (direction, train, station, time).
+
+Usage:
+    python caltrain_schedule_parser.py --url <pdf-url> --output schedule.csv
+"""
+
+import argparse
+import functools
+import os
+import re
+
+import camelot
+import pandas as pd
+import requests
+from PyPDF2 import PdfReader
+
+try:
+    import fitz  # PyMuPDF; optional fast path for table extraction
+except ImportError:
+    fitz = None
+
+# Compiled once at import; these run inside per-table and per-column loops.
+_TIME_RE = re.compile(r"^\d{2}:\d{2} [AP]M$")
+_MERIDIEM_RE = re.compile(r"(?<!m)([ap])$")
+_TIME_TOKEN_RE = re.compile(r"\b\d{1,2}:\d{2}[ap]\b")
+
+# Known stations as they appear in the timetable (lowercased), mapped to
+# the canonical names used in the output. Longest names must match first
+# ("south san francisco" before "san francisco").
+STATIONS = {
+    "san francisco": "SF",
+    "22nd street": "22nd St",
+    "bayshore": "Bayshore",
+    "south san francisco": "South SF",
+    "san bruno": "San Bruno",
+    "millbrae": "Millbrae",
+    "broadway": "Broadway",
+    "burlingame": "Burlingame",
+    "san mateo": "San Mateo",
+    "hayward park": "Hayward Park",
+    "hillsdale": "Hillsdale",
+    "belmont": "Belmont",
+    "san carlos": "San Carlos",
+    "redwood city": "Redwood City",
+    "menlo park": "Menlo Park",
+    "palo alto": "Palo Alto",
+    "california ave": "California Ave",
+    "san antonio": "San Antonio",
+    "mountain view": "Mountain View",
+    "sunnyvale": "Sunnyvale",
+    "lawrence": "Lawrence",
+    "santa clara": "Santa Clara",
+    "college park": "College Park",
+    "san jose diridon": "San Jose Diridon",
+    "tamien": "Tamien",
+    "capitol": "Capitol",
+    "blossom hill": "Blossom Hill",
+    "morgan hill": "Morgan Hill",
+    "san martin": "San Martin",
+    "gilroy": "Gilroy",
+}
+_STATIONS_BY_LENGTH = sorted(STATIONS, key=len, reverse=True)
+
+# Station-label canonicalization, applied in a single Series.replace call.
+# Longer phrases come first so "South San Francisco" wins over
+# "San Francisco".
+STATION_REPLACEMENTS = {
+    re.escape(old): new
+    for old, new in [
+        ("Station", ""),
+        ("Transit Center", "TC"),
+        ("South San Francisco", "South SF"),
+        ("San Francisco", "SF"),
+        ("22nd Street", "22nd St"),
+        ("4th & King", "4th & King SF"),
+    ]
+}
+
+
+def download_pdf(url, output_path):
+    """Download the schedule PDF to output_path, streaming in 64 KiB chunks."""
+    print(f"Downloading {url}...")
+    with requests.get(url, stream=True, timeout=30) as response:
+        response.raise_for_status()
+        with open(output_path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=65536):
+                f.write(chunk)
+    print(f"Saved to {output_path}")
+    return output_path
+
+
+@functools.lru_cache(maxsize=None)
+def _open_pdf(pdf_path):
+    """Parse the PDF once per path; reused by every page-text lookup."""
+    if fitz is not None:
+        return fitz.open(pdf_path)
+    return PdfReader(pdf_path)
+
+
+def _page_count(pdf_path):
+    doc = _open_pdf(pdf_path)
+    return doc.page_count if fitz is not None else len(doc.pages)
+
+
+@functools.lru_cache(maxsize=None)
+def _page_text(pdf_path, page_index):
+    """Lowercased text of one page, extracted once per (file, page)."""
+    doc = _open_pdf(pdf_path)
+    if fitz is not None:
+        return doc[page_index].get_text().lower()
+    return doc.pages[page_index].extract_text().lower()
+
+
+def split_pdf_by_direction(pdf_path):
+    """Classify each page of the PDF as northbound or southbound.
+
+    Returns a dict mapping direction name to a list of 1-based page numbers.
+    """
+    pages_by_direction = {"Northbound": [], "Southbound": []}
+    for i in range(_page_count(pdf_path)):
+        text = _page_text(pdf_path, i)
+        if "northbound" in text:
+            pages_by_direction["Northbound"].append(i + 1)
+        elif "southbound" in text:
+            pages_by_direction["Southbound"].append(i + 1)
+    return pages_by_direction
+
+
+def extract_schedule_tables(pdf_path, pages, direction):
+    """Extract the timetable grids for one direction with Camelot.
+
+    All pages for the direction are passed to a single read_pdf call so the
+    source PDF is parsed once rather than once per page.
+
+    Returns a list of (direction, DataFrame) tuples, one per detected table.
+    """
+    if not pages:
+        return []
+    page_spec = ",".join(map(str, pages))
+    print(f"Extracting {direction} tables from pages {page_spec}...")
+    tables = camelot.read_pdf(pdf_path, pages=page_spec, flavor="lattice")
+    tables_with_direction = []
+    for table in tables:
+        df = table.df
+        # Lattice tables keep the rendered page bitmap alive on _image;
+        # only the DataFrame is needed, so release it immediately.
+        table._image = None
+        table._text = None
+        tables_with_direction.append((direction, df))
+    return tables_with_direction
+
+
+def extract_schedule_tables_fitz(pdf_path):
+    """Extract all timetable grids in one pass with PyMuPDF.
+
+    Opens the document once, classifies each page's direction from its text
+    and pulls the tables with the C-implemented find_tables analyzer,
+    replacing the per-direction Camelot invocations.
+
+    Returns a list of (direction, DataFrame) tuples, one per detected table.
+    """
+    tables_with_direction = []
+    doc = fitz.open(pdf_path)
+    for page in doc:
+        text = page.get_text().lower()
+        if "northbound" in text:
+            direction = "Northbound"
+        elif "southbound" in text:
+            direction = "Southbound"
+        else:
+            continue
+        for table in page.find_tables().tables:
+            # Raw rows, matching the shape Camelot produces (row 0 holds
+            # the train numbers, column 0 the stations).
+            tables_with_direction.append((direction, pd.DataFrame(table.extract())))
+    doc.close()
+    return tables_with_direction
+
+
+def extract_schedule_rows_text(pdf_path):
+    """Regex fast path: emit long-form rows straight from the page text.
+
+    The timetable is a fixed grid of known stations and time tokens, so a
+    deterministic text scan avoids the table-layout engines entirely.
+    Returns the long-form DataFrame, or None when the text layout doesn't
+    match and the table-based path should run instead.
+    """
+    directions, trains, stations, times = [], [], [], []
+    for i in range(_page_count(pdf_path)):
+        text = _page_text(pdf_path, i)
+        if "northbound" in text:
+            direction = "Northbound"
+        elif "southbound" in text:
+            direction = "Southbound"
+        else:
+            continue
+
+        train_numbers = []
+        for line in text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            tokens = line.split()
+            if len(tokens) >= 2 and all(t.isdigit() for t in tokens):
+                train_numbers = [int(t) for t in tokens]
+                continue
+            station = next(
+                (s for s in _STATIONS_BY_LENGTH if line.startswith(s)), None
+            )
+            if station is None or not train_numbers:
+                continue
+            line_times = _TIME_TOKEN_RE.findall(line)
+            # A skipped stop leaves a blank cell the text layer drops
+            # entirely, which would shift every later time onto the wrong
+            # train; only a full row aligns with the header unambiguously.
+            if len(line_times) != len(train_numbers):
+                continue
+            for train_number, time in zip(train_numbers, line_times):
+                directions.append(direction)
+                trains.append(train_number)
+                stations.append(STATIONS[station])
+                times.append(time)
+
+    if not times:
+        return None
+    parsed = pd.to_datetime(
+        pd.Series(times) + "m", format="%I:%M%p", errors="coerce"
+    )
+    result_df = pd.DataFrame(
+        {
+            "direction": pd.Categorical(directions),
+            "train_number": pd.array(trains, dtype="int32"),
+            "station": pd.Categorical(stations),
+            "time": parsed.dt.strftime("%I:%M %p"),
+        }
+    )
+    return result_df.dropna(subset=["time"]).reset_index(drop=True)
+
+
+def transform_schedule_data(tables_with_direction):
+    """Turn the extracted wide-format grids into long-form schedule rows.
+
+    Each grid is melted to long form once, then stations and times are
+    cleaned with whole-column pandas operations instead of per-cell calls.
+    """
+    cleaned_frames = []
+    for direction, df in tables_with_direction:
+        # First row carries the train numbers; first column the stations.
+        station_col = df.columns[0]
+        header = df.iloc[0, 1:].astype(str).str.strip()
+        train_cols = header[header.str.isdigit()]
+        if train_cols.empty:
+            continue
+        train_numbers = dict(zip(train_cols.index, train_cols.astype(int)))
+
+        long = df.iloc[1:].melt(
+            id_vars=[station_col],
+            value_vars=list(train_numbers),
+            var_name="train_col",
+            value_name="time",
+        )
+        long["train_number"] = long["train_col"].map(train_numbers)
+
+        station = long[station_col].astype(str).str.strip()
+        station = station.replace(STATION_REPLACEMENTS, regex=True)
+        long["station"] = station.str.strip()
+        long["direction"] = direction
+        cleaned_frames.append(long[["direction", "train_number", "station", "time"]])
+
+    if not cleaned_frames:
+        return pd.DataFrame(columns=["direction", "train_number", "station", "time"])
+    result_df = pd.concat(cleaned_frames, ignore_index=True)
+
+    # Parse every time cell across all tables in one datetime pass rather
+    # than once per table.
+    time = result_df["time"].astype(str).str.strip().str.lower()
+    time = time.replace(
+        {"": pd.NA, "-": pd.NA, "--": pd.NA, "—": pd.NA, "–": pd.NA, "nan": pd.NA}
+    )
+    # Cells sometimes read "4:05p" or "11:32a"; pad out the meridiem and
+    # drop any spacing so one explicit format covers every cell — without
+    # format= pandas falls back to per-element dateutil inference.
+    time = time.str.replace(_MERIDIEM_RE, r"\1m", regex=True)
+    time = time.str.replace(" ", "", regex=False)
+    result_df["time"] = pd.to_datetime(
+        time, format="%I:%M%p", errors="coerce"
+    ).dt.strftime("%I:%M %p")
+
+    result_df = result_df.dropna(subset=["time"])
+    result_df = result_df[result_df["station"] != ""]
+    # direction/station have a handful of unique values; categorical codes
+    # make the downstream sort/groupby integer comparisons.
+    result_df["direction"] = result_df["direction"].astype("category")
+    result_df["station"] = result_df["station"].astype("category")
+    result_df["train_number"] = result_df["train_number"].astype("int32")
+    return result_df.reset_index(drop=True)
+
+
+def validate_schedule_data(df):
+    """Sanity-check the transformed schedule before writing it out."""
+    if df.empty:
+        raise Exception("No schedule data was extracted")
+
+    bad_times = df[~df["time"].str.match(_TIME_RE)]
+    if not bad_times.empty:
+        raise Exception(f"Malformed times: {bad_times['time'].unique().tolist()}")
+
+    # Times for a given train should increase monotonically along its route.
+    # One datetime parse of the whole column, then a single groupby pass.
+    parsed = pd.to_datetime(df["time"], format="%I:%M %p")
+    bad = parsed.groupby([df["direction"], df["train_number"]]).apply(
+        lambda s: not s.is_monotonic_increasing
+    )
+    if bad.any():
+        raise Exception(f"Non-sequential times for trains: {bad[bad].index.tolist()}")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse the Caltrain schedule PDF")
+    parser.add_argument(
+        "--url",
+        default="https://www.caltrain.com/media/34716",
+        help="URL of the Caltrain weekday timetable PDF",
+    )
+    parser.add_argument("--output", default="caltrain_schedule.csv")
+    parser.add_argument("--tmp-dir", default="/tmp/caltrain")
+    args = parser.parse_args()
+
+    os.makedirs(args.tmp_dir, exist_ok=True)
+    pdf_path = os.path.join(args.tmp_dir, "caltrain_schedule.pdf")
+    download_pdf(args.url, pdf_path)
+
+    # Deterministic text scan first; fall back to table-layout extraction
+    # when the text doesn't look like the expected grid.
+    schedule_df = extract_schedule_rows_text(pdf_path)
+    if schedule_df is None:
+        if fitz is not None:
+            tables_with_direction = extract_schedule_tables_fitz(pdf_path)
+        else:
+            pages_by_direction = split_pdf_by_direction(pdf_path)
+            print(f"Pages by direction: {pages_by_direction}")
+            tables_with_direction = []
+            for direction, pages in pages_by_direction.items():
+                tables_with_direction.extend(
+                    extract_schedule_tables(pdf_path, pages, direction)
+                )
+        schedule_df = transform_schedule_data(tables_with_direction)
+    validate_schedule_data(schedule_df)
+
+    schedule_df = schedule_df.sort_values(
+        ["direction", "train_number", "time"]
+    ).reset_index(drop=True)
+    schedule_df.to_csv(args.output, index=False)
+    print(f"Wrote {len(schedule_df)} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,798 @@
+"""Extract quarterly balance sheets from 10-Q PDFs into CSV and markdown.
+
+Downloads each quarterly filing, locates the condensed consolidated balance
+sheet, extracts the table with tabula, cleans the account labels and amounts,
+and writes a combined CSV plus per-quarter markdown tables.
+
+Usage:
+    python extract_balance_sheets.py --urls <pdf-url> [<pdf-url> ...]
+"""
+
+import argparse
+import csv
+import functools
+import glob
+import json
+import logging
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import requests
+import tabula
+from PyPDF2 import PdfReader
+from requests.adapters import HTTPAdapter
+
+# Shared session: keep-alive plus a connection pool sized for the
+# download thread pool, so repeated hosts skip the TCP/TLS handshake.
+log = logging.getLogger(__name__)
+
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=16))
+
+try:
+    import fitz  # PyMuPDF; optional fast path for page-text extraction
+except ImportError:
+    fitz = None
+
+try:
+    import ahocorasick  # optional; single-pass multi-term page scans
+except ImportError:
+    ahocorasick = None
+
+try:
+    import pdfplumber  # optional; in-process table extraction, no JVM
+except ImportError:
+    pdfplumber = None
+
+try:
+    import orjson  # optional; faster JSON parsing for tabula batch output
+
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# Arrow-backed strings dispatch .str ops to vectorized C++ kernels instead
+# of the per-cell Python fallback, and Arrow's multi-threaded CSV writer
+# replaces pandas' pure-Python one; plain pandas is the graceful fallback.
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    _STRING_DTYPE = "string[pyarrow]"
+except ImportError:
+    pa = pa_csv = None
+    _STRING_DTYPE = "string"
+
+# Compiled once at import; these are hit for every cell/column scanned.
+_MONTHS = (
+    "January|February|March|April|May|June|July|August|September|"
+    "October|November|December"
+)
+# One combined pattern covers both "Month DD, YYYY" and "Month YYYY".
+_DATE_RE = re.compile(rf"({_MONTHS})\s+(?:\d{{1,2}},?\s+)?(\d{{4}})", re.IGNORECASE)
+_QUARTER_RE = re.compile(r"FY(\d+)\s+Q(\d)")
+_HEADER_ROW_RE = re.compile(r"total|subtotal|section|summary", re.IGNORECASE)
+# Quarter/fiscal-year tokens in either order within a filing URL.
+_QFY_RE = re.compile(r"fy(\d{2}).*?q([1-4])|q([1-4]).*?fy(\d{2})", re.IGNORECASE)
+_Q_ONLY_RE = re.compile(r"q([1-4])", re.IGNORECASE)
+
+# Boilerplate rows dropped from every extracted sheet.
+_UNWANTED_RE = re.compile(
+    "|".join(
+        map(
+            re.escape,
+            [
+                "condensed consolidated balance sheets",
+                "consolidated balance sheets",
+                "in thousands",
+                "in millions",
+                "unaudited",
+                "see accompanying notes",
+            ],
+        )
+    ),
+    re.IGNORECASE,
+)
+
+BALANCE_SHEET_TERMS = [
+    "condensed consolidated balance sheets",
+    "consolidated balance sheets",
+    "consolidated balance sheet",
+    "balance sheets",
+    "statements of financial position",
+    "statement of financial position",
+]
+
+# One automaton (or compiled alternation) so each page is scanned once
+# for every balance-sheet term instead of once per term.
+if ahocorasick is not None:
+    _BS_AUTOMATON = ahocorasick.Automaton()
+    for _term in BALANCE_SHEET_TERMS:
+        _BS_AUTOMATON.add_word(_term, _term)
+    _BS_AUTOMATON.make_automaton()
+else:
+    _BS_AUTOMATON = None
+_BS_TERMS_RE = re.compile("|".join(map(re.escape, BALANCE_SHEET_TERMS)))
+
+DEFAULT_URLS = [
+    "https://s26.q4cdn.com/463892824/files/doc_financials/2024/q1/Snowflake-FY24-Q1-10Q.pdf",
+    "https://s26.q4cdn.com/463892824/files/doc_financials/2024/q2/Snowflake-FY24-Q2-10Q.pdf",
+    "https://s26.q4cdn.com/463892824/files/doc_financials/2024/q3/Snowflake-FY24-Q3-10Q.pdf",
+]
+
+account_categories = {
+    "Current Assets": {
+        "order": 1,
+        "patterns": [
+            "cash and cash equivalents",
+            "short-term investments",
+            "accounts receivable",
+            "prepaid expenses",
+            "other current assets",
+            "total current assets",
+        ],
+    },
+    "Non-Current Assets": {
+        "order": 2,
+        "patterns": [
+            "long-term investments",
+            "property and equipment",
+            "operating lease right-of-use",
+            "goodwill",
+            "intangible assets",
+            "other assets",
+            "total assets",
+        ],
+    },
+    "Current Liabilities": {
+        "order": 3,
+        "patterns": [
+            "accounts payable",
+            "accrued expenses",
+            "operating lease liabilities",
+            "deferred revenue",
+            "other current liabilities",
+            "total current liabilities",
+        ],
+    },
+    "Non-Current Liabilities": {
+        "order": 4,
+        "patterns": [
+            "deferred revenue, non-current",
+            "operating lease liabilities, non-current",
+            "other liabilities",
+            "total liabilities",
+        ],
+    },
+    "Stockholders Equity": {
+        "order": 5,
+        "patterns": [
+            "common stock",
+            "additional paid-in capital",
+            "accumulated other comprehensive",
+            "accumulated deficit",
+            "retained earnings",
+            "total stockholders",
+        ],
+    },
+}
+
+
+def download_pdf(url, output_dir):
+    """Download one PDF into output_dir; returns the local path or None."""
+    filename = os.path.basename(url.split("?")[0]) or "statement.pdf"
+    filepath = os.path.join(output_dir, filename)
+    log.info("Downloading %s...", url)
+    try:
+        with SESSION.get(url, stream=True, timeout=(5, 60)) as response:
+            response.raise_for_status()
+            # Copy straight from the raw socket with a 1 MiB buffer; one
+            # C-level read/write per MiB instead of a Python loop per chunk.
+            response.raw.decode_content = True
+            with open(filepath, "wb") as f:
+                shutil.copyfileobj(response.raw, f, length=1 << 20)
+    except requests.RequestException as e:
+        log.warning("Failed to download %s: %s", url, e)
+        return None
+    return filepath
+
+
+def download_pdfs(urls, output_dir):
+    """Download every filing concurrently, returning paths aligned with urls.
+
+    Downloads are network-bound, so a small thread pool collapses the
+    serial latencies into roughly the slowest single transfer.
+    """
+    if not urls:
+        return []
+    with ThreadPoolExecutor(max_workers=min(8, len(urls))) as executor:
+        return list(executor.map(lambda url: download_pdf(url, output_dir), urls))
+
+
+@functools.lru_cache(maxsize=None)
+def _open_pdf(pdf_path):
+    """Parse the PDF once per path; reused by every page-text lookup."""
+    if fitz is not None:
+        return fitz.open(pdf_path)
+    return PdfReader(pdf_path)
+
+
+def _page_count(pdf_path):
+    doc = _open_pdf(pdf_path)
+    return doc.page_count if fitz is not None else len(doc.pages)
+
+
+@functools.lru_cache(maxsize=None)
+def _page_text(pdf_path, page_index):
+    """Lowercased text of one page, extracted once per (file, page)."""
+    doc = _open_pdf(pdf_path)
+    if fitz is not None:
+        return doc[page_index].get_text().lower()
+    return doc.pages[page_index].extract_text().lower()
+
+
+def find_balance_sheet_page(pdf_path):
+    """Return the 1-based page numbers that look like balance sheet pages."""
+    potential_pages = []
+    for i in range(_page_count(pdf_path)):
+        text = _page_text(pdf_path, i)
+        if _BS_AUTOMATON is not None:
+            hit = next(_BS_AUTOMATON.iter(text), None) is not None
+        else:
+            hit = _BS_TERMS_RE.search(text) is not None
+        if hit:
+            potential_pages.append(i + 1)
+            # Balance sheet pages sit together; no need to scan further.
+            if len(potential_pages) >= 3:
+                break
+    return potential_pages
+
+
+@functools.lru_cache(maxsize=512)
+def extract_date_from_text(text):
+    """Pull a 'Month YYYY' statement date out of free text, if present.
+
+    The same header text recurs across value columns and pages of one
+    filing, so results are memoized on the input string.
+    """
+    if not text:
+        return None
+    match = _DATE_RE.search(text)
+    if match:
+        return f"{match.group(1).title()} {match.group(2)}"
+    return None
+
+
+def extract_date_from_pdf(pdf_path):
+    """Find the statement date by scanning the first few pages of a filing."""
+    for i in range(min(3, _page_count(pdf_path))):
+        date = extract_date_from_text(_page_text(pdf_path, i))
+        if date:
+            return date
+    return None
+
+
+# Word prefixes that must each appear somewhere in a balance sheet's labels.
+_SECTION_PREFIXES = (("asset",), ("liabilit",), ("equity", "stockholder", "shareholder"))
+_WORD_RE = re.compile(r"[a-z]+")
+
+
+def validate_balance_sheet_structure(table):
+    """Check that the first column mentions assets, liabilities and equity.
+
+    The column is tokenized into a word set in one pass; each section test
+    is then a prefix check against the set instead of re-joining and
+    re-scanning the whole column.
+    """
+    tokens = set()
+    table.iloc[:, 0].astype(str).str.lower().str.findall(_WORD_RE).map(tokens.update)
+    for prefixes in _SECTION_PREFIXES:
+        if not any(token.startswith(prefixes) for token in tokens):
+            return False
+    return True
+
+
+def _read_tables(pdf_path, pages, lattice):
+    """One tabula pass over a page spec in either lattice or stream mode."""
+    try:
+        return tabula.read_pdf(
+            pdf_path,
+            pages=pages,
+            multiple_tables=True,
+            pandas_options={"header": None},
+            lattice=lattice,
+            stream=not lattice,
+            guess=not lattice,
+            area=[0, 0, 100, 100],
+            relative_area=True,
+            silent=True,
+        )
+    except Exception as e:
+        log.warning("tabula failed on pages %s: %s", pages, e)
+        return []
+
+
+def _tabula_jar_path():
+    """Path of the tabula jar bundled with tabula-py, or None."""
+    jars = glob.glob(os.path.join(os.path.dirname(tabula.__file__), "*.jar"))
+    return jars[0] if jars else None
+
+
+def _tables_from_json(raw):
+    """Rebuild DataFrames from tabula's JSON table dump."""
+    tables = []
+    for tbl in _json_loads(raw):
+        rows = [[cell.get("text", "") for cell in row] for row in tbl.get("data", [])]
+        if rows:
+            tables.append(pd.DataFrame(rows))
+    return tables
+
+
+def batch_extract_tables(pdf_paths):
+    """Extract tables from many filings with a single tabula JVM launch.
+
+    tabula.read_pdf pays ~1s of JVM startup per call; the CLI's --batch
+    mode processes a whole directory in one JVM and writes one JSON file
+    per PDF. Returns {pdf_path: [DataFrame, ...]}; an empty dict when the
+    CLI is unavailable or fails, so callers fall back to per-file runs.
+    """
+    paths = [p for p in pdf_paths if p]
+    jar = _tabula_jar_path()
+    if not paths or jar is None:
+        return {}
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for path in paths:
+                shutil.copy(path, tmpdir)
+            subprocess.run(
+                [
+                    "java",
+                    "-jar",
+                    jar,
+                    "--batch",
+                    tmpdir,
+                    "--pages",
+                    "1-10",
+                    "--lattice",
+                    "--format",
+                    "JSON",
+                ],
+                check=True,
+                capture_output=True,
+            )
+            for path in paths:
+                stem = os.path.splitext(os.path.basename(path))[0]
+                json_path = os.path.join(tmpdir, stem + ".json")
+                if os.path.exists(json_path):
+                    with open(json_path, "rb") as f:
+                        results[path] = _tables_from_json(f.read())
+    except (OSError, subprocess.SubprocessError) as e:
+        log.warning("Batch tabula extraction failed; using per-file runs: %s", e)
+        return {}
+    return results
+
+
+def _extract_tables_pdfplumber(pdf_path, page_numbers):
+    """Extract tables from the given 1-based pages in-process.
+
+    pdfplumber parses via pdfminer.six in the same interpreter: no JVM
+    launch or file round-trip, and the IO-bound parts release the GIL so
+    multiple filings can extract concurrently in threads.
+    """
+    tables = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for page_no in page_numbers:
+            if page_no > len(pdf.pages):
+                continue
+            page = pdf.pages[page_no - 1]
+            extracted = page.extract_tables(
+                {"vertical_strategy": "lines", "horizontal_strategy": "lines"}
+            ) or page.extract_tables(
+                {"vertical_strategy": "text", "horizontal_strategy": "text"}
+            )
+            tables.extend(pd.DataFrame(t) for t in extracted or [] if t)
+    return tables
+
+
+def extract_balance_sheet(pdf_path, tables=None):
+    """Locate and extract the balance sheet table from one filing.
+
+    Pre-extracted tables from batch_extract_tables are tried first, then
+    pdfplumber's in-process extraction; the tabula JVM path only runs as
+    the final fallback. All candidate pages are read in one lattice pass;
+    the stream pass only runs when lattice finds nothing usable, and
+    selection stops at the first valid balance sheet.
+    """
+    if tables:
+        table = _select_balance_sheet(tables)
+        if table is not None:
+            return table
+
+    target_pages = find_balance_sheet_page(pdf_path)
+    if not target_pages:
+        target_pages = list(range(1, 11))
+
+    if pdfplumber is not None:
+        table = _select_balance_sheet(
+            _extract_tables_pdfplumber(pdf_path, target_pages)
+        )
+        if table is not None:
+            return table
+
+    # One JVM launch and PDF parse for all candidate pages at once.
+    pages_spec = ",".join(map(str, target_pages))
+    table = _select_balance_sheet(_read_tables(pdf_path, pages_spec, lattice=True))
+    if table is None:
+        table = _select_balance_sheet(
+            _read_tables(pdf_path, pages_spec, lattice=False)
+        )
+    return table
+
+
+def _concat_cols(table, cols, sep=""):
+    """Concatenate string columns element-wise with numpy; no axis-1 apply."""
+    arrays = [table[c].fillna("").astype(str).to_numpy(dtype=str) for c in cols]
+    merged = arrays[0]
+    for arr in arrays[1:]:
+        if sep:
+            merged = np.char.add(merged, sep)
+        merged = np.char.add(merged, arr)
+    return merged
+
+
+def _table_contains(table, needle):
+    """True if any cell contains needle; stops at the first matching column."""
+    for _, col in table.items():
+        contains = (
+            col.astype(_STRING_DTYPE)
+            .str.lower()
+            .str.contains(needle, regex=False, na=False)
+        )
+        if contains.any():
+            return True
+    return False
+
+
+def _select_balance_sheet(page_tables):
+    """Pick the first table in a page's extraction that is a balance sheet."""
+    for table in page_tables:
+        if table is None or table.empty:
+            continue
+        table = table.astype(_STRING_DTYPE)
+        # Keyword screen straight over the columns; no flattened copy.
+        if not _table_contains(table, "assets"):
+            continue
+        if not _table_contains(table, "liabilit"):
+            continue
+
+        # Tabula often splits the account label across several leading
+        # columns; merge them back into one.
+        label_cols = []
+        for col in table.columns:
+            # Already string dtype from the cast above; no per-column copy.
+            if table[col].str.contains(r"\d", na=False).mean() < 0.3:
+                label_cols.append(col)
+            else:
+                break
+        if len(label_cols) > 1:
+            merged_values = pd.Series(
+                np.char.strip(_concat_cols(table, label_cols, sep=" ")),
+                index=table.index,
+            )
+            table = table.drop(columns=label_cols[1:])
+            table[label_cols[0]] = merged_values
+
+        # It also splits "$" markers away from their amounts.
+        for col in list(table.columns[1:]):
+            if (table[col].str.strip() == "$").fillna(False).mean() > 0.5:
+                pos = list(table.columns).index(col)
+                if pos + 1 < len(table.columns):
+                    neighbor = table.columns[pos + 1]
+                    table[neighbor] = pd.Series(
+                        _concat_cols(table, [col, neighbor]), index=table.index
+                    )
+                table = table.drop(columns=[col])
+
+        values_flat = pd.Series(table.iloc[:, 1:].values.ravel()).astype(_STRING_DTYPE)
+        numeric_count = (
+            pd.to_numeric(
+                values_flat.str.replace(r"[^\d.\-]", "", regex=True),
+                errors="coerce",
+            )
+            .notna()
+            .sum()
+        )
+        if numeric_count < 4:
+            continue
+        if not validate_balance_sheet_structure(table):
+            continue
+        return table
+    return None
+
+
+def clean_balance_sheet(df):
+    """Clean up account labels and amounts in an extracted balance sheet."""
+    if df is None or df.empty:
+        return None
+
+    # Whole-column string cleanup: collapse line breaks and runs of
+    # whitespace, blank out stray "nan" cells — no per-cell Python calls.
+    # Only object/string columns are converted; numeric columns stay numeric.
+    str_cols = df.select_dtypes(include=["object", "string"]).columns
+    df[str_cols] = df[str_cols].astype(_STRING_DTYPE)
+    for col in str_cols:
+        s = df[col].fillna("")
+        df[col] = (
+            s.str.replace("\r", " ", regex=False)
+            .str.replace("\n", " ", regex=False)
+            .str.replace(r"\s+", " ", regex=True)
+            .str.strip()
+            .mask(s.str.lower() == "nan", "")
+        )
+
+    account_col = df.columns[0]
+
+    df = df[~df[account_col].str.contains(_UNWANTED_RE, na=False)]
+    df = df[df[account_col] != ""]
+
+    value_cols = list(df.columns[1:])
+
+    # Join each value column's text once for the statement-date scan.
+    column_dates = {}
+    if value_cols:
+        joined = df[value_cols].fillna("").agg(" ".join, axis=0)
+        for col, column_text in joined.items():
+            date = extract_date_from_text(column_text)
+            if date:
+                column_dates[col] = date
+
+    for col in value_cols:
+        if pd.api.types.is_numeric_dtype(df[col]):
+            continue
+        log.debug("Cleaning values in column %s...", col)
+        s = df[col].str.replace(r"[$,]", "", regex=True)
+        negative = s.str.startswith("(") & s.str.endswith(")")
+        s = s.where(~negative, "-" + s.str.slice(1, -1))
+        df[col] = pd.to_numeric(s, errors="coerce")
+
+    df = df.rename(columns={account_col: "Account", **column_dates})
+    df = df.dropna(subset=[c for c in df.columns if c != "Account"], how="all")
+    return df
+
+
+def clean_numeric_series(s):
+    """Vectorized amount parser: one pandas string pass per column.
+
+    Strips currency symbols/commas, converts parenthesized negatives and
+    k/m/b suffixes, and coerces the result with a single pd.to_numeric call.
+    """
+    s = s.astype(_STRING_DTYPE).str.strip()
+    s = s.str.replace(r"[\$€£¥,\s]", "", regex=True)
+    s = s.str.replace(r"^\((.*)\)$", r"-\1", regex=True)
+    scale = s.str[-1:].str.lower().map({"k": 1e3, "m": 1e6, "b": 1e9})
+    base = pd.to_numeric(s.where(scale.isna(), s.str[:-1]), errors="coerce")
+    return base.mul(scale.fillna(1.0))
+
+
+def clean_and_validate_data(df):
+    """Final numeric coercion and row validation for one balance sheet."""
+    if df is None or df.empty:
+        return None
+    numeric_cols = [c for c in df.columns if c != "Account"]
+    # One block-wise assignment instead of repeated per-column label
+    # lookups (the extracted frames often carry duplicated labels).
+    str_cols = [c for c in numeric_cols if not pd.api.types.is_numeric_dtype(df[c])]
+    if str_cols:
+        df[str_cols] = df[str_cols].apply(clean_numeric_series)
+    df = df.dropna(subset=numeric_cols, how="all")
+    if df.empty:
+        return None
+    return df
+
+
+@functools.lru_cache(maxsize=None)
+def quarter_sort_key(quarter):
+    """Sortable integer for quarter labels like 'FY24 Q2'; memoized since
+    only a handful of distinct labels ever occur."""
+    match = _QUARTER_RE.match(str(quarter))
+    if match:
+        return int(match.group(1)) * 10 + int(match.group(2))
+    return 0
+
+
+def _process_one(url, pdf_path, tables=None):
+    """Extract and annotate the balance sheet for one downloaded filing.
+
+    Top-level so it can be pickled into worker processes.
+    """
+    if pdf_path is None:
+        return None
+    log.info("Processing %s...", pdf_path)
+    statement_date = extract_date_from_pdf(pdf_path)
+    table = extract_balance_sheet(pdf_path, tables)
+    df = clean_and_validate_data(clean_balance_sheet(table))
+    if df is None:
+        log.warning("No balance sheet found in %s", pdf_path)
+        return None
+
+    # One C-level regex scan of the URL instead of nested substring loops.
+    quarter_info = None
+    match = _QFY_RE.search(url)
+    if match:
+        fy = match.group(1) or match.group(4)
+        q = match.group(2) or match.group(3)
+        quarter_info = f"FY{fy} Q{q}"
+    else:
+        match = _Q_ONLY_RE.search(os.path.basename(url))
+        if match:
+            quarter_info = f"Q{match.group(1)}"
+
+    df["Quarter"] = quarter_info or statement_date or "Unknown"
+    df["Statement_Date"] = statement_date
+    df["Source_File"] = os.path.basename(pdf_path)
+    return df
+
+
+def process_pdfs(pdf_urls, output_dir):
+    """Download and extract every filing, returning the combined DataFrame."""
+    pdf_paths = download_pdfs(pdf_urls, output_dir)
+
+    # One JVM launch extracts every filing up front; the per-file tabula
+    # path inside the workers only runs for files the batch run missed.
+    batch_tables = batch_extract_tables(pdf_paths) if len(pdf_paths) > 1 else {}
+    table_lists = [batch_tables.get(path) for path in pdf_paths]
+
+    # Per-filing extraction is CPU/JVM-bound with no shared state, so fan
+    # the files out across cores; keep the single-file case in-process.
+    if len(pdf_paths) > 1:
+        with ProcessPoolExecutor() as executor:
+            results = list(executor.map(_process_one, pdf_urls, pdf_paths, table_lists))
+    else:
+        results = [
+            _process_one(url, path, tables)
+            for url, path, tables in zip(pdf_urls, pdf_paths, table_lists)
+        ]
+    all_balance_sheets = [df for df in results if df is not None]
+
+    if not all_balance_sheets:
+        raise Exception("No balance sheets could be extracted")
+    # Assemble the combined frame column-by-column with np.concatenate:
+    # one contiguous allocation per column and no dtype re-inference, vs
+    # pd.concat copying every block. Quarters can disagree on value
+    # columns, so each frame is first reindexed to the column union.
+    all_cols = []
+    for df in all_balance_sheets:
+        all_cols.extend(c for c in df.columns if c not in all_cols)
+    frames = [df.reindex(columns=all_cols) for df in all_balance_sheets]
+    combined_bs = pd.DataFrame(
+        {col: np.concatenate([f[col].to_numpy() for f in frames]) for col in all_cols},
+        copy=False,
+    )
+    combined_bs["Quarter"] = combined_bs["Quarter"].astype("category")
+    combined_bs["Source_File"] = combined_bs["Source_File"].astype("category")
+
+    # Drop roll-up and section header rows; totals are listed per category
+    # in the markdown output instead.
+    header_mask = combined_bs.iloc[:, 0].str.contains(_HEADER_ROW_RE, na=False)
+    combined_bs = combined_bs[~header_mask]
+
+    # Sort on integer keys with np.lexsort (last key is primary) instead
+    # of materializing three helper columns for sort_values and dropping
+    # them again. Category codes follow the lexical order the old string
+    # sort produced.
+    categories, orders = _categorize_accounts(combined_bs["Account"])
+    quarter_sort = (
+        combined_bs["Quarter"]
+        .map({q: quarter_sort_key(q) for q in combined_bs["Quarter"].unique()})
+        .to_numpy(dtype="int16")
+    )
+    cat_codes = pd.Categorical(categories).codes
+    idx = np.lexsort(
+        (
+            combined_bs["Account"].to_numpy(),
+            orders.to_numpy(dtype="int16"),
+            cat_codes,
+            quarter_sort,
+        )
+    )
+    return combined_bs.iloc[idx].reset_index(drop=True)
+
+
+def _categorize_accounts(accounts):
+    """Classify a whole Account column in one pass over the pattern table.
+
+    Returns (category, order) Series aligned with accounts; unmatched rows
+    get ("Other", 999). Each pattern scans the column once, instead of
+    once per quarter.
+    """
+    acct_lower = accounts.astype(_STRING_DTYPE).str.lower()
+    categories = pd.Series("Other", index=accounts.index)
+    orders = pd.Series(999, index=accounts.index)
+    unassigned = pd.Series(True, index=accounts.index)
+    for category, info in account_categories.items():
+        for i, pattern in enumerate(info["patterns"]):
+            hits = unassigned & acct_lower.str.contains(pattern, regex=False, na=False)
+            if hits.any():
+                categories[hits] = category
+                orders[hits] = info["order"] * 100 + i
+                unassigned &= ~hits
+    return categories, orders
+
+
+def generate_markdown_tables(df, markdown_path):
+    """Write per-quarter markdown tables grouped by account category."""
+    meta_cols = ("Account", "Quarter", "Statement_Date", "Source_File")
+    df = df.copy()
+    categories, orders = _categorize_accounts(df["Account"])
+    df["_order"] = orders
+    # Match the old pattern loops: only categorized accounts are emitted.
+    df = df[categories != "Other"]
+
+    markdown_text = ["# Balance Sheets by Quarter", ""]
+    quarters = sorted(df["Quarter"].unique(), key=quarter_sort_key)
+    for quarter in quarters:
+        quarter_data = df[df["Quarter"] == quarter].sort_values("_order")
+        value_cols = [
+            c
+            for c in quarter_data.columns
+            if c not in meta_cols and c != "_order" and quarter_data[c].notna().any()
+        ]
+        markdown_text.append(f"## {quarter}")
+        markdown_text.append("")
+        markdown_text.append("| Account | " + " | ".join(value_cols) + " |")
+        markdown_text.append("|" + "---|" * (len(value_cols) + 1))
+        # Format each value column in one pass, then assemble every row
+        # with vectorized string concatenation — no iterrows.
+        rows = "| " + quarter_data["Account"].astype(str)
+        for col in value_cols:
+            values = quarter_data[col]
+            formatted = values.abs().map("{:,.0f}".format)
+            formatted = formatted.where(values >= 0, "(" + formatted + ")")
+            rows = rows + " | " + formatted.where(values.notna(), "")
+        markdown_text.extend((rows + " |").tolist())
+        markdown_text.append("")
+
+    Path(markdown_path).write_text("\n".join(markdown_text), encoding="utf-8")
+    log.info("Wrote markdown tables to %s", markdown_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Extract quarterly balance sheets from 10-Q PDFs"
+    )
+    parser.add_argument("--urls", nargs="+", default=DEFAULT_URLS)
+    parser.add_argument("--output", default="balance_sheets.csv")
+    parser.add_argument("--markdown", default="balance_sheets.md")
+    parser.add_argument("--tmp-dir", default="/tmp/balance_sheets")
+    args = parser.parse_args()
+
+    # Logging is a no-op above the configured level; set LOGLEVEL=WARNING
+    # for batch runs to silence the per-file status lines entirely.
+    logging.basicConfig(level=os.environ.get("LOGLEVEL", "INFO"))
+    os.makedirs(args.tmp_dir, exist_ok=True)
+    output_data = process_pdfs(args.urls, args.tmp_dir)
+    generate_markdown_tables(output_data, args.markdown)
+
+    for col in output_data.columns:
+        if pd.api.types.is_numeric_dtype(output_data[col]):
+            num = pd.to_numeric(output_data[col], errors="coerce")
+            output_data[col] = num.map("{:,.2f}".format).where(num.notna(), "")
+    if pa_csv is not None:
+        pa_csv.write_csv(
+            pa.Table.from_pandas(output_data, preserve_index=False), args.output
+        )
+    else:
+        output_data.to_csv(args.output, index=False, quoting=csv.QUOTE_MINIMAL)
+    log.info("Wrote %d rows to %s", len(output_data), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""Parse Snowflake's condensed consolidated balance sheet from a 10-Q PDF.
+
+Downloads the filing, locates the balance sheet page with PyPDF2, pulls
+the table off that page with Camelot, and reshapes it into a long-format
+DataFrame written to CSV.
+
+Usage:
+    python snowflake_balance_sheet_parser.py [--url <pdf-url>]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import camelot
+import numpy as np
+import pandas as pd
+import PyPDF2
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# One pooled session serves the HEAD probe and the download, keeping the
+# TCP/TLS connection alive across calls and retrying transient failures.
+_SESSION = requests.Session()
+_SESSION.mount(
+    "https://",
+    HTTPAdapter(pool_maxsize=16, max_retries=Retry(total=3, backoff_factor=0.5)),
+)
+
+DEFAULT_URL = (
+    "https://s26.q4cdn.com/463892824/files/doc_financials/2025/q3/"
+    "Snowflake-FY25-Q3-10Q.pdf"
+)
+
+_DATE_RE = re.compile(r"(?:January|April|July|October)\s+\d{1,2},\s+\d{4}")
+# Drops currency characters and turns an opening paren into a leading
+# minus, all in one pass over each cell.
+_AMOUNT_TBL = str.maketrans({"$": None, ",": None, "(": "-", ")": None})
+# All balance-sheet anchors in one case-insensitive pass; the heading
+# sits near the top of the page, so only a short prefix is scanned.
+_BS_RE = re.compile(
+    r"CONDENSED CONSOLIDATED BALANCE SHEETS.*?(in thousands|assets|liabilities)",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+def _cache_key(url):
+    """Content-addressed cache key for a filing URL."""
+    return hashlib.sha256(url.encode()).hexdigest()
+
+
+def download_pdf(url, tmp_dir, use_cache=True):
+    """Download the filing, reusing a cached copy while it stays fresh.
+
+    The cache key is the URL's SHA-256; the validators from a HEAD
+    request (ETag/Last-Modified) are stored in a sidecar so a cached PDF
+    is only reused while the server still advertises the same revision.
+    """
+    cache_dir = os.path.join(tmp_dir, ".cache")
+    os.makedirs(cache_dir, exist_ok=True)
+    pdf_path = os.path.join(cache_dir, _cache_key(url) + ".pdf")
+    meta_path = pdf_path + ".json"
+
+    validators = {}
+    if use_cache:
+        try:
+            head = _SESSION.head(url, allow_redirects=True, timeout=10)
+            head.raise_for_status()
+            validators = {
+                "etag": head.headers.get("ETag"),
+                "last_modified": head.headers.get("Last-Modified"),
+            }
+        except requests.RequestException:
+            validators = {}
+        if os.path.exists(pdf_path) and os.path.exists(meta_path):
+            with open(meta_path) as f:
+                cached = json.load(f)
+            if not any(validators.values()) or cached == validators:
+                print(f"Using cached PDF for {url}")
+                return pdf_path
+
+    print(f"Downloading {url}...")
+    response = _SESSION.get(url, stream=True, timeout=(5, 30))
+    response.raise_for_status()
+    with open(pdf_path, "wb") as f:
+        # 1 MiB chunks keep the copy loop to a handful of iterations for
+        # a multi-megabyte filing.
+        for chunk in response.iter_content(chunk_size=1 << 20):
+            f.write(chunk)
+    if not any(validators.values()):
+        validators = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+    with open(meta_path, "w") as f:
+        json.dump(validators, f)
+    return pdf_path
+
+
+def _match_balance_sheet(text):
+    """True when the text reads like the balance sheet page.
+
+    A single regex pass over the page prefix replaces the upper/lower
+    copies and the three separate substring scans.
+    """
+    return _BS_RE.search(text[:4000]) is not None
+
+
+# Worker-process state: each pool worker opens the PDF once in its
+# initializer rather than once per page task.
+_WORKER_READER = None
+_WORKER_FILE = None
+
+
+def _init_text_worker(pdf_path):
+    global _WORKER_READER, _WORKER_FILE
+    _WORKER_FILE = open(pdf_path, "rb")
+    _WORKER_READER = PyPDF2.PdfReader(_WORKER_FILE)
+
+
+def _page_text_worker(page_num):
+    return page_num, _WORKER_READER.pages[page_num].extract_text() or ""
+
+
+def find_balance_sheet_page(reader, pdf_path=None):
+    """Find the page holding the condensed consolidated balance sheet.
+
+    extract_text is pure-Python and CPU-bound, so when a path is given
+    the pages are fanned out across worker processes; outstanding tasks
+    are cancelled as soon as a page matches.
+    """
+    n_pages = len(reader.pages)
+    workers = min(os.cpu_count() or 1, 4)
+    if pdf_path is not None and workers > 1 and n_pages > 1:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_text_worker,
+            initargs=(pdf_path,),
+        ) as executor:
+            futures = [
+                executor.submit(_page_text_worker, i) for i in range(n_pages)
+            ]
+            try:
+                for future in as_completed(futures):
+                    page_num, text = future.result()
+                    if _match_balance_sheet(text):
+                        print(f"Found balance sheet on page {page_num + 1}")
+                        return page_num
+            finally:
+                for future in futures:
+                    future.cancel()
+        return None
+
+    for page_num, page in enumerate(reader.pages):
+        text = page.extract_text()
+        if text and _match_balance_sheet(text):
+            print(f"Found balance sheet on page {page_num + 1}")
+            return page_num
+    return None
+
+
+def extract_page_to_pdf(reader, page_number, out_path):
+    """Write a single page out to its own PDF for Camelot."""
+    writer = PyPDF2.PdfWriter()
+    writer.add_page(reader.pages[page_number])
+    with open(out_path, "wb") as out:
+        writer.write(out)
+    return out_path
+
+
+def extract_table_data(page_pdf):
+    """Extract the balance sheet table from the single-page PDF."""
+    tables = camelot.read_pdf(page_pdf, pages="1", flavor="stream")
+    if len(tables) == 0:
+        raise ValueError("No tables found on the balance sheet page")
+    best = max(tables, key=lambda t: t.df.shape[0])
+    return best.df
+
+
+def clean_table_data(df):
+    """Clean the raw Camelot table into a long-format DataFrame."""
+    df = df.copy()
+    df.columns = range(df.shape[1])
+
+    # Locate the header row carrying the statement dates; everything
+    # above it is page furniture.
+    header_idx = None
+    date_cols = {}
+    for idx, row in df.iterrows():
+        for col in df.columns[1:]:
+            match = _DATE_RE.search(str(row[col]))
+            if match:
+                date_cols[col] = match.group(0)
+        if len(date_cols) >= 2:
+            header_idx = idx
+            break
+    if header_idx is None:
+        raise ValueError("No statement dates found in the extracted table")
+
+    df = df.iloc[header_idx + 1 :].reset_index(drop=True)
+    keep = [0] + sorted(date_cols)
+    df = df[keep]
+    df.columns = ["line_item"] + [date_cols[c] for c in sorted(date_cols)]
+
+    # One regex pass collapses newlines and runs of whitespace together;
+    # strip afterwards covers the leading/trailing remnants.
+    df["line_item"] = (
+        df["line_item"].astype(str).str.replace(r"\s+", " ", regex=True).str.strip()
+    )
+    df = df[df["line_item"] != ""]
+
+    date_columns = list(df.columns[1:])
+    for col in date_columns:
+        s = df[col].astype(str).str.translate(_AMOUNT_TBL)
+        df[col] = pd.to_numeric(s.str.strip(), errors="coerce")
+
+    # Carry section headers down onto the rows beneath them. Category
+    # rows are flagged with whole-column string ops and forward-filled,
+    # instead of walking the frame row by row.
+    li = df["line_item"]
+    lower = li.str.lower()
+    is_cat = lower.str.contains(r"assets|liabilities|equity|total", regex=True)
+    ends_colon = li.str.endswith(":")
+    starts_total = lower.str.startswith("total")
+    cat = pd.Series(
+        np.where(
+            is_cat & ends_colon,
+            li.str.rstrip(":"),
+            np.where(is_cat & starts_total, li, np.nan),
+        ),
+        index=df.index,
+    )
+    df["category"] = cat.ffill().fillna("")
+
+    # One C-level melt replaces copying the frame once per statement
+    # date and concatenating the copies back together.
+    final_df = df.melt(
+        id_vars=["category", "line_item"],
+        value_vars=date_columns,
+        var_name="fiscal_quarter",
+        value_name="amount",
+    )[["fiscal_quarter", "category", "line_item", "amount"]]
+
+    # Whole-column np.select dispatch instead of a Python call per row.
+    # Snowflake's fiscal year ends January 31, so a January date closes
+    # the fiscal year it names while later months open the next one.
+    s = final_df["fiscal_quarter"]
+    yr = s.str[-4:].astype(int)
+    conds = [
+        s.str.contains("January"),
+        s.str.contains("April"),
+        s.str.contains("July"),
+        s.str.contains("October"),
+    ]
+    choices = [
+        "Q4 FY" + yr.astype(str),
+        "Q1 FY" + (yr + 1).astype(str),
+        "Q2 FY" + (yr + 1).astype(str),
+        "Q3 FY" + (yr + 1).astype(str),
+    ]
+    final_df["fiscal_quarter"] = np.select(conds, choices, default=s)
+    # The amounts already left pd.to_numeric as floats; a single nullable
+    # integer cast replaces the per-row stringify/parse round-trip.
+    final_df = final_df[final_df["amount"].notna()]
+    final_df["amount"] = final_df["amount"].round().astype("Int64")
+    return final_df
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Parse Snowflake's balance sheet from a 10-Q PDF"
+    )
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--output", default="snowflake_balance_sheet.csv")
+    parser.add_argument("--tmp-dir", default="/tmp/snowflake_10q")
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="ignore cached downloads and results",
+    )
+    args = parser.parse_args()
+
+    os.makedirs(args.tmp_dir, exist_ok=True)
+    use_cache = not args.no_cache
+
+    # On a cache hit the cleaned result is replayed directly, skipping
+    # the download and the whole Camelot parse.
+    result_path = os.path.join(
+        args.tmp_dir, ".cache", _cache_key(args.url) + ".parquet"
+    )
+    if use_cache and os.path.exists(result_path):
+        print(f"Using cached result for {args.url}")
+        final_df = pd.read_parquet(result_path)
+        final_df.to_csv(args.output, index=False)
+        print(f"Wrote {len(final_df)} rows to {args.output}")
+        return
+
+    pdf_path = download_pdf(args.url, args.tmp_dir, use_cache)
+    page_pdf = os.path.join(args.tmp_dir, "balance_sheet_page.pdf")
+    # One PdfReader serves both the page scan and the page copy; each
+    # helper used to re-open the file and re-parse the xref table.
+    with open(pdf_path, "rb") as f:
+        reader = PyPDF2.PdfReader(f)
+        page_number = find_balance_sheet_page(reader, pdf_path)
+        if page_number is None:
+            raise SystemExit("Balance sheet page not found")
+        extract_page_to_pdf(reader, page_number, page_pdf)
+    df = extract_table_data(page_pdf)
+    final_df = clean_table_data(df)
+
+    if use_cache:
+        try:
+            final_df.to_parquet(result_path)
+        except (ImportError, OSError):
+            pass
+    final_df.to_csv(args.output, index=False)
+    print(f"Wrote {len(final_df)} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()